@@ -0,0 +1,26 @@
+"""Script to report the cosine drift of an embedder backend against fp32."""
+
+import argparse
+
+from vectorapi.backends import BACKENDS, DRIFT_SAMPLE_SENTENCES, measure_backend_drift
+from vectorapi.const import DEFAULT_EMBEDDING_MODEL
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backend", choices=BACKENDS, required=True)
+    parser.add_argument(
+        "--sentences-file", help="file with one sample sentence per line (default: built-in set)"
+    )
+    args = parser.parse_args()
+
+    sentences = DRIFT_SAMPLE_SENTENCES
+    if args.sentences_file:
+        with open(args.sentences_file) as fh:
+            sentences = [line.strip() for line in fh if line.strip()]
+
+    drift = measure_backend_drift(args.model, args.backend, sentences)
+    print(
+        f"model={drift.model_name} backend={drift.backend} sentences={drift.num_sentences} "
+        f"mean_cosine={drift.mean_cosine:.6f} min_cosine={drift.min_cosine:.6f}"
+    )
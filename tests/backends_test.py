@@ -0,0 +1,29 @@
+import contextlib
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+from vectorapi.backends import apply_backend, backend_context, validate_backend
+
+
+class TestBackends:
+    def test_validate_backend(self):
+        validate_backend("int8")
+        with pytest.raises(ValueError, match="Invalid embedder backend"):
+            validate_backend("fp8")
+
+    def test_non_cpu_device(self):
+        with pytest.raises(ValueError, match="only supported on cpu"):
+            apply_backend(MagicMock(), "int8", "cuda")
+
+    def test_int8_quantizes_linear_layers(self):
+        model = torch.nn.Sequential(torch.nn.Linear(4, 4))
+        quantized = apply_backend(model, "int8", "cpu")  # type: ignore
+        assert not isinstance(quantized[0], torch.nn.Linear)
+        assert quantized(torch.ones(1, 4)).shape == (1, 4)
+
+    def test_backend_context(self):
+        assert isinstance(backend_context("fp32"), contextlib.nullcontext)
+        with backend_context("bf16"):
+            assert torch.is_autocast_cpu_enabled()
@@ -0,0 +1,48 @@
+import asyncio
+from typing import List
+
+import numpy as np
+import pytest
+
+from vectorapi.batching import EncodeBatcher
+
+pytestmark = pytest.mark.asyncio
+
+
+class RecordingEncoder:
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    async def __call__(self, texts: List[str]):
+        self.calls.append(texts)
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+async def test_concurrent_calls_share_one_batch():
+    encoder = RecordingEncoder()
+    batcher = EncodeBatcher(encoder, max_batch_size=8, max_wait_ms=50)
+
+    texts = ["a", "bb", "ccc", "dddd"]
+    results = await asyncio.gather(*[batcher.encode(text) for text in texts])
+
+    assert encoder.calls == [texts]
+    assert [result[0] for result in results] == [1, 2, 3, 4]
+
+
+async def test_batches_are_capped_at_max_batch_size():
+    encoder = RecordingEncoder()
+    batcher = EncodeBatcher(encoder, max_batch_size=2, max_wait_ms=50)
+
+    await asyncio.gather(*[batcher.encode(str(i)) for i in range(5)])
+
+    assert [len(call) for call in encoder.calls] == [2, 2, 1]
+
+
+async def test_errors_are_sent_to_every_caller():
+    async def failing_encoder(texts: List[str]):
+        raise RuntimeError("boom")
+
+    batcher = EncodeBatcher(failing_encoder, max_batch_size=8, max_wait_ms=1)
+
+    results = await asyncio.gather(batcher.encode("a"), batcher.encode("b"), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
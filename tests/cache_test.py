@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from vectorapi.cache import DiskEmbeddingCache, EmbeddingCache
+
+
+class TestEmbeddingCache:
+    def test_get_put(self):
+        cache = EmbeddingCache("test-model", max_bytes=1024)
+        assert cache.get("foo") is None
+
+        vector = np.array([1, 2, 3], dtype=np.float32)
+        cache.put("foo", vector)
+        vector[0] = 42
+
+        cached = cache.get("foo")
+        assert cached is not None
+        assert cached.tolist() == [1, 2, 3]
+
+    def test_returns_read_only_arrays(self):
+        cache = EmbeddingCache("test-model", max_bytes=1024)
+        cache.put("foo", np.array([1, 2, 3], dtype=np.float32))
+
+        cached = cache.get("foo")
+        assert cached is not None
+        with pytest.raises(ValueError):
+            cached[0] = 42
+
+    def test_evicts_least_recently_used_over_byte_budget(self):
+        # each vector is 4 float32 values = 16 bytes, so the budget fits two of them
+        cache = EmbeddingCache("test-model", max_bytes=32)
+        cache.put("a", np.zeros(4, dtype=np.float32))
+        cache.put("b", np.zeros(4, dtype=np.float32))
+        cache.get("a")
+        cache.put("c", np.zeros(4, dtype=np.float32))
+
+        assert len(cache) == 2
+        assert cache.size_bytes == 32
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_disabled(self):
+        cache = EmbeddingCache("test-model", max_bytes=0)
+        cache.put("foo", np.zeros(4, dtype=np.float32))
+        assert cache.get("foo") is None
+
+
+class TestDiskEmbeddingCache:
+    def test_get_put(self, tmp_path):
+        cache = DiskEmbeddingCache(str(tmp_path / "cache.db"), max_bytes=1024)
+        cache.put_many("model-a", ["foo"], [np.array([1, 2, 3], dtype=np.float32)])
+
+        assert [
+            v.tolist() if v is not None else None for v in cache.get_many("model-a", ["foo", "bar"])
+        ] == [[1, 2, 3], None]
+        # entries are keyed by model name
+        assert cache.get_many("model-b", ["foo"]) == [None]
+
+    def test_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        DiskEmbeddingCache(path, max_bytes=1024).put_many(
+            "model-a", ["foo"], [np.array([1, 2, 3], dtype=np.float32)]
+        )
+
+        (stored,) = DiskEmbeddingCache(path, max_bytes=1024).get_many("model-a", ["foo"])
+        assert stored is not None
+        assert stored.tolist() == [1, 2, 3]
+
+    def test_evicts_over_byte_budget(self, tmp_path):
+        # each vector is 4 float32 values = 16 bytes
+        cache = DiskEmbeddingCache(str(tmp_path / "cache.db"), max_bytes=64)
+        texts = [str(i) for i in range(10)]
+        for text in texts:
+            cache.put_many("model-a", [text], [np.zeros(4, dtype=np.float32)])
+
+        stored = cache.get_many("model-a", texts)
+        assert sum(vector is not None for vector in stored) <= 4
+        assert stored[-1] is not None
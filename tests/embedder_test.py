@@ -1,10 +1,15 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import numpy as np
 import pytest
 from pytest_benchmark.plugin import BenchmarkFixture
 
-from vectorapi.embedder import Embedder
+from vectorapi.embedder import (
+    Embedder,
+    EmbedderRegistry,
+    similarity_scores,
+    top_k_indices,
+)
 
 
 class TestEmbedder:
@@ -20,9 +25,70 @@ class TestEmbedder:
         result = embedder.generate_similarity("test", ["test1", "test2"])
         assert result.tolist() == [1, 2, 3]
 
+    def test_encode_batch_keeps_input_order(self):
+        embedder = Embedder(batch_size=2, cache_max_bytes=0)
+        texts = ["a much longer text than all of the others", "short", "a medium text", "b"]
+        result = embedder.encode_batch(texts)
+        expected = embedder.model.encode(texts, normalize_embeddings=True)
+        assert result.shape == (len(texts), embedder.dimension)
+        assert np.allclose(result, expected, atol=1e-5)
+
+    def test_max_seq_length_truncates(self):
+        embedder = Embedder(max_seq_length=4, cache_max_bytes=0)
+        assert embedder.max_seq_length == 4
+        long_text = "one two three four five six seven eight"
+        assert embedder.count_tokens([long_text]) == [4]
+        assert (
+            embedder.tokenize([long_text])["input_ids"][0][-1]
+            == embedder.model.tokenizer.sep_token_id
+        )
+
+    def test_similarity_scores(self):
+        source = np.array([1.0, 0.0], dtype=np.float32)
+        vectors = np.array([[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]], dtype=np.float32)
+        result = similarity_scores(source, vectors)
+        assert result.tolist() == pytest.approx([1.0, 0.0, 0.6])
+
+    @pytest.mark.parametrize("k, expected", [(1, [3]), (2, [3, 1]), (10, [3, 1, 0, 2])])
+    def test_top_k_indices(self, k, expected):
+        scores = np.array([0.1, 0.5, -0.2, 0.9], dtype=np.float32)
+        assert top_k_indices(scores, k).tolist() == expected
+
     @pytest.mark.skip(reason="benchmark test")
     def test_encode__benchmark(self, benchmark: BenchmarkFixture):
         embedder = Embedder(model_name="BAAI/bge-small-en-v1.5")
         # encode once to make sure we have cache
         embedder.encode("test")
         benchmark(embedder.encode, "Why is my Mimir query performance so slow?")
+
+
+class FakeEmbedder:
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.memory_bytes = 100
+
+
+@patch("vectorapi.embedder.Embedder", FakeEmbedder)
+class TestEmbedderRegistry:
+    def test_get_loads_once(self):
+        registry = EmbedderRegistry(memory_budget_bytes=1000)
+        embedder = registry.get("model-a")
+        assert registry.get("model-a") is embedder
+        assert [e.model_name for e in registry.loaded()] == ["model-a"]
+
+    def test_evicts_least_recently_used_over_memory_budget(self):
+        registry = EmbedderRegistry(memory_budget_bytes=250)
+        registry.get("model-a")
+        registry.get("model-b")
+        registry.get("model-a")
+        registry.get("model-c")
+
+        assert [e.model_name for e in registry.loaded()] == ["model-a", "model-c"]
+        assert registry.memory_bytes == 200
+
+    def test_keeps_model_larger_than_budget(self):
+        registry = EmbedderRegistry(memory_budget_bytes=10)
+        registry.get("model-a")
+        registry.get("model-b")
+
+        assert [e.model_name for e in registry.loaded()] == ["model-b"]
@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+from vectorapi.inference import InferenceExecutor
+
+pytestmark = pytest.mark.asyncio
+
+
+class ThreadRecordingEmbedder:
+    model_name = "test-model"
+
+    def encode_batch(self, texts):
+        return threading.current_thread().name, texts
+
+
+async def test_thread_executor_runs_off_the_event_loop():
+    executor = InferenceExecutor(mode="thread", replicas=2, torch_threads=0)
+    try:
+        thread_name, texts = await executor.run(ThreadRecordingEmbedder(), "encode_batch", ["a"])
+    finally:
+        executor.shutdown()
+
+    assert thread_name.startswith("inference")
+    assert thread_name != threading.current_thread().name
+    assert texts == ["a"]
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError, match="Invalid inference executor mode"):
+        InferenceExecutor(mode="gpu")
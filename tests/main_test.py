@@ -18,6 +18,15 @@ def test_healthz():
     assert response.status_code == 200
 
 
+@mock.patch("vectorapi.main.embedder_registry")
+def test_healthz_while_preloading(embedder_registry):
+    embedder_registry.preloading = True
+    app = main.create_app()
+    client = fastapi.testclient.TestClient(app)
+    response = client.get("/healthz")
+    assert response.status_code == 503
+
+
 @mock.patch("vectorapi.main.loguru.logger")
 def test_endpoints_have_log(logger):
     patch_mock = Mock()
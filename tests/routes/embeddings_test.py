@@ -1,3 +1,4 @@
+import json
 from unittest.mock import Mock, patch
 
 import numpy as np
@@ -21,6 +22,9 @@ class MockEmbedder(Embedder):
     def encode(self, text):
         return np.random.random(3)
 
+    def encode_batch(self, texts):
+        return np.random.random((len(texts), 3))
+
 
 # path embedder.encode
 @patch("vectorapi.routes.embeddings.get_embedder")
@@ -51,3 +55,97 @@ async def test_similarity(get_embedder_mock: Mock):
         )
 
     assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+@patch("vectorapi.routes.embeddings.get_embedder")
+async def test_similarity_top_k(get_embedder_mock: Mock):
+    get_embedder_mock.return_value = MockEmbedder()
+    similarity_request = SimilarityRequest(
+        sourceSentence="foo", sentences=["bar", "baz", "qux"], topK=2
+    )
+
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post(
+            "/v1/similarity", content=similarity_request.model_dump_json(by_alias=True)
+        )
+
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == 2
+    assert results[0]["score"] >= results[1]["score"]
+    assert {result["index"] for result in results} <= {0, 1, 2}
+
+
+@patch("vectorapi.routes.embeddings.get_embedder")
+async def test_embeddings_batch_input(get_embedder_mock: Mock):
+    get_embedder_mock.return_value = MockEmbedder()
+    embedding_request = EmbeddingRequest(input=["foo", "bar", "baz"])
+
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/v1/embeddings", content=embedding_request.model_dump_json())
+
+    assert response.status_code == 200
+    embedding_response = EmbeddingResponse.model_validate_json(response.content)
+    assert [data.index for data in embedding_response.data] == [0, 1, 2]
+    assert all(len(data.embedding) == 3 for data in embedding_response.data)
+
+
+async def test_embeddings_empty_batch_input():
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/v1/embeddings", json={"input": []})
+
+    assert response.status_code == 422
+
+
+@patch("vectorapi.routes.embeddings.get_embedder")
+async def test_embeddings_usage(get_embedder_mock: Mock):
+    embedder = MockEmbedder()
+    get_embedder_mock.return_value = embedder
+    texts = ["foo", "bar baz"]
+    embedding_request = EmbeddingRequest(input=texts)
+
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/v1/embeddings", content=embedding_request.model_dump_json())
+
+    assert response.status_code == 200
+    usage = EmbeddingResponse.model_validate_json(response.content).usage
+    assert usage.prompt_tokens == sum(embedder.count_tokens(texts))
+    assert usage.prompt_tokens > 0
+    assert usage.total_tokens == usage.prompt_tokens
+
+
+@patch("vectorapi.routes.embeddings.EMBEDDINGS_STREAM_BATCH_SIZE", 2)
+@patch("vectorapi.routes.embeddings.get_embedder")
+async def test_stream_embeddings(get_embedder_mock: Mock):
+    get_embedder_mock.return_value = MockEmbedder()
+    body = b'"foo"\n"bar"\n\n"baz"\n"qux"\n"quux"'
+
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/v1/embeddings/stream", content=body)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert all(len(line["embedding"]) == 3 for line in lines)
+
+
+@patch("vectorapi.routes.embeddings.EMBEDDINGS_STREAM_BATCH_SIZE", 2)
+@patch("vectorapi.routes.embeddings.get_embedder")
+async def test_stream_embeddings_invalid_line(get_embedder_mock: Mock):
+    get_embedder_mock.return_value = MockEmbedder()
+    body = b'"foo"\n"bar"\n{"input": "baz"}\n"qux"\n'
+
+    app = main.create_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/v1/embeddings/stream", content=body)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["object"] for line in lines] == ["embedding", "embedding", "error"]
+    assert lines[-1]["index"] == 2
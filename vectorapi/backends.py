@@ -0,0 +1,159 @@
+"""CPU inference backends applied to SentenceTransformer models after loading."""
+import contextlib
+import warnings
+from dataclasses import dataclass
+from typing import Any, ContextManager, Dict, List, Sequence
+
+import numpy as np
+import torch
+from loguru import logger
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.models import Transformer
+from torch.amp.autocast_mode import autocast
+from torch.ao.quantization import quantize_dynamic
+
+from vectorapi.const import EMBEDDER_BACKENDS, EMBEDDER_DEFAULT_BACKEND
+
+BACKENDS = ("fp32", "int8", "bf16", "traced")
+
+# sentences used to measure the drift of a backend against fp32 when none are given
+DRIFT_SAMPLE_SENTENCES = [
+    "Why is my Mimir query performance so slow?",
+    "How do I create an alert rule for high CPU usage?",
+    'sum(rate(http_requests_total{status=~"5.."}[5m])) by (service)',
+    "Loki returns 'too many outstanding requests' when querying logs.",
+    "I enjoy taking long walks along the beach.",
+    "Grafana dashboards support template variables and repeating panels.",
+    "error: context deadline exceeded",
+    "What is the retention period for traces in Tempo?",
+]
+
+
+def backend_for_model(model_name: str) -> str:
+    return EMBEDDER_BACKENDS.get(model_name, EMBEDDER_DEFAULT_BACKEND)
+
+
+def validate_backend(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid embedder backend {backend}, expected one of {BACKENDS}")
+
+
+class _Float32Embedding(torch.nn.Module):
+    """Last module of a bf16 model, so sentence embeddings can be converted to numpy."""
+
+    def forward(self, features: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        features["sentence_embedding"] = features["sentence_embedding"].float()
+        return features
+
+
+class _TracedAutoModel(torch.nn.Module):
+    """
+    Stands in for the HuggingFace model of a SentenceTransformer `Transformer` module, running
+    a TorchScript trace of it instead.
+    """
+
+    def __init__(self, traced: torch.jit.ScriptModule, input_names: List[str], config):
+        super().__init__()
+        self.traced = traced
+        self.input_names = input_names
+        self.config = config
+
+    def forward(self, return_dict: bool = False, **features: torch.Tensor):
+        return (self.traced(*[features[name] for name in self.input_names]),)
+
+
+class _LastHiddenState(torch.nn.Module):
+    def __init__(self, auto_model: torch.nn.Module, input_names: List[str]):
+        super().__init__()
+        self.auto_model = auto_model
+        self.input_names = input_names
+
+    def forward(self, *inputs: torch.Tensor) -> torch.Tensor:
+        features = dict(zip(self.input_names, inputs))
+        return self.auto_model(**features, return_dict=False)[0]
+
+
+def _trace(model: SentenceTransformer) -> SentenceTransformer:
+    for module in list(model.modules()):
+        if not isinstance(module, Transformer):
+            continue
+        features = model.tokenize(DRIFT_SAMPLE_SENTENCES[:2])
+        input_names = [
+            name for name in ("input_ids", "attention_mask", "token_type_ids") if name in features
+        ]
+        inputs = tuple(features[name] for name in input_names)
+        with torch.no_grad(), warnings.catch_warnings():
+            # tracing warns about every python value it has to treat as a constant
+            warnings.simplefilter("ignore")
+            traced = torch.jit.trace(
+                _LastHiddenState(module.auto_model, input_names), inputs, check_trace=False
+            )
+        module.auto_model = _TracedAutoModel(traced.eval(), input_names, module.auto_model.config)
+    return model
+
+
+def apply_backend(model: SentenceTransformer, backend: str, device: str) -> SentenceTransformer:
+    """
+    Convert a loaded fp32 model for the given backend:
+
+    - `fp32`: the model as loaded.
+    - `int8`: dynamic int8 quantization of the linear layers (CPU only).
+    - `bf16`: run under bf16 autocast, see `backend_context`.
+    - `traced`: a TorchScript trace of the transformer.
+    """
+    validate_backend(backend)
+    if backend != "fp32" and device != "cpu":
+        raise ValueError(f"Embedder backend {backend} is only supported on cpu, not {device}")
+
+    logger.debug(f"Applying embedder backend {backend}")
+    model.eval()
+    if backend == "int8":
+        return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if backend == "bf16":
+        model.append(_Float32Embedding())
+    if backend == "traced":
+        return _trace(model)
+    return model
+
+
+def backend_context(backend: str) -> ContextManager[Any]:
+    """
+    Context in which forward passes of a model using the given backend must run.
+    """
+    if backend == "bf16":
+        return autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
+@dataclass
+class BackendDrift:
+    model_name: str
+    backend: str
+    num_sentences: int
+    mean_cosine: float
+    min_cosine: float
+
+
+def measure_backend_drift(
+    model_name: str, backend: str, sentences: Sequence[str] = DRIFT_SAMPLE_SENTENCES
+) -> BackendDrift:
+    """
+    Compare the embeddings produced by `backend` with the fp32 ones for the same sentences,
+    reporting the cosine similarity between the two embeddings of each sentence.
+    """
+    sentences = list(sentences)
+    reference = SentenceTransformer(model_name, device="cpu").encode(
+        sentences, normalize_embeddings=True, convert_to_numpy=True
+    )
+    model = apply_backend(SentenceTransformer(model_name, device="cpu"), backend, "cpu")
+    with backend_context(backend):
+        candidate = model.encode(sentences, normalize_embeddings=True, convert_to_numpy=True)
+
+    cosine = np.sum(reference * candidate, axis=1)
+    return BackendDrift(
+        model_name=model_name,
+        backend=backend,
+        num_sentences=len(sentences),
+        mean_cosine=float(cosine.mean()),
+        min_cosine=float(cosine.min()),
+    )
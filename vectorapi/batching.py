@@ -0,0 +1,66 @@
+"""Micro-batching of concurrent encode calls into a single forward pass."""
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+EncodeBatchFn = Callable[[List[str]], Awaitable[NDArray[np.float32]]]
+PendingEncode = Tuple[str, "asyncio.Future[NDArray[np.float32]]"]
+
+
+class EncodeBatcher:
+    """
+    Gathers concurrent encode calls for one model and runs them as a single batched forward pass.
+
+    The first queued text opens a batch, which is flushed once `max_batch_size` texts are queued
+    or `max_wait_ms` milliseconds have passed, whichever comes first. Each caller gets back the
+    row of the batched result matching its own text.
+    """
+
+    def __init__(self, encode_batch: EncodeBatchFn, max_batch_size: int, max_wait_ms: float):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: List[PendingEncode] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def encode(self, text: str) -> NDArray[np.float32]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[NDArray[np.float32]] = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush_pending)
+        return await future
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._flush(batch))
+
+    async def _flush(self, batch: List[PendingEncode]):
+        # callers that went away (e.g. client disconnects) don't need a forward pass
+        pending = [(text, future) for text, future in batch if not future.done()]
+        if not pending:
+            return
+
+        logger.debug(f"Encoding batch of {len(pending)} texts")
+        try:
+            vectors = await self.encode_batch([text for text, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(pending, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -0,0 +1,251 @@
+"""Byte-bounded caches of computed embeddings, in memory and on disk."""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+from loguru import logger
+from prometheus_client import Counter, Gauge
+
+from vectorapi.const import EMBEDDING_DISK_CACHE_MAX_BYTES, EMBEDDING_DISK_CACHE_PATH
+
+CACHE_HITS = Counter("vectorapi_embedding_cache_hits_total", "Embedding cache hits", ["model_name"])
+CACHE_MISSES = Counter(
+    "vectorapi_embedding_cache_misses_total", "Embedding cache misses", ["model_name"]
+)
+CACHE_EVICTIONS = Counter(
+    "vectorapi_embedding_cache_evictions_total", "Embedding cache evictions", ["model_name"]
+)
+CACHE_BYTES = Gauge(
+    "vectorapi_embedding_cache_bytes", "Bytes held by the embedding cache", ["model_name"]
+)
+DISK_CACHE_HITS = Counter(
+    "vectorapi_embedding_disk_cache_hits_total", "Embedding disk cache hits", ["model_name"]
+)
+DISK_CACHE_MISSES = Counter(
+    "vectorapi_embedding_disk_cache_misses_total", "Embedding disk cache misses", ["model_name"]
+)
+DISK_CACHE_EVICTIONS = Counter(
+    "vectorapi_embedding_disk_cache_evictions_total", "Embedding disk cache evictions"
+)
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    LRU cache of embeddings for a single model, bounded by the bytes held by the cached arrays.
+
+    Entries are keyed by a hash of the text so long inputs don't stay alive as keys. Cached
+    arrays are read-only since the same array is handed to every caller.
+    """
+
+    def __init__(self, model_name: str, max_bytes: int):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: OrderedDict[bytes, NDArray[np.float32]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_HITS.labels(model_name)
+        self._misses = CACHE_MISSES.labels(model_name)
+        self._evictions = CACHE_EVICTIONS.labels(model_name)
+        self._bytes = CACHE_BYTES.labels(model_name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[NDArray[np.float32]]:
+        if not self.enabled:
+            return None
+
+        key = text_hash(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        self._hits.inc()
+        return vector
+
+    def put(self, text: str, vector: NDArray[np.float32]) -> NDArray[np.float32]:
+        """
+        Cache `vector` for `text` and return the read-only array held by the cache.
+        """
+        vector = np.array(vector, copy=True)
+        vector.setflags(write=False)
+        if not self.enabled or vector.nbytes > self.max_bytes:
+            return vector
+
+        key = text_hash(text)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous.nbytes
+            self._entries[key] = vector
+            self.size_bytes += vector.nbytes
+
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.nbytes
+                self._evictions.inc()
+            self._bytes.set(self.size_bytes)
+        return vector
+
+
+class DiskEmbeddingCache:
+    """
+    SQLite-backed embedding store keyed by (model name, text hash).
+
+    The database runs in WAL mode so every worker on a host can share the same file, and it
+    survives restarts. The total size of the stored embeddings is tracked in the database and
+    kept under `max_bytes` by evicting the least recently used entries.
+    """
+
+    # evict a few extra entries when over budget so we don't evict on every single insert
+    EVICTION_HEADROOM = 0.05
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model_name TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    embedding BLOB NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (model_name, text_hash)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ix_embeddings_accessed_at ON embeddings (accessed_at);
+                CREATE TABLE IF NOT EXISTS stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    size_bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO stats (id, size_bytes) VALUES (0, 0);
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(
+        self, model_name: str, texts: Sequence[str]
+    ) -> List[Optional[NDArray[np.float32]]]:
+        """
+        Look up the embeddings of `texts`, returning None for the ones that are not stored.
+        """
+        if not texts:
+            return []
+
+        hashes = [text_hash(text) for text in texts]
+        conn = self._connection()
+        found: Dict[bytes, bytes] = {}
+        # stay well below sqlite's limit on the number of bound parameters
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT text_hash, embedding FROM embeddings "
+                f"WHERE model_name = ? AND text_hash IN ({placeholders})",
+                [model_name, *chunk],
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            placeholders = ",".join("?" * len(found))
+            conn.execute(
+                "UPDATE embeddings SET accessed_at = ? "
+                f"WHERE model_name = ? AND text_hash IN ({placeholders})",
+                [time.time(), model_name, *found.keys()],
+            )
+
+        DISK_CACHE_HITS.labels(model_name).inc(len(found))
+        DISK_CACHE_MISSES.labels(model_name).inc(len(hashes) - len(found))
+        return [np.frombuffer(found[h], dtype=np.float32) if h in found else None for h in hashes]
+
+    def put_many(
+        self, model_name: str, texts: Sequence[str], vectors: Sequence[NDArray[np.float32]]
+    ) -> None:
+        now = time.time()
+        rows = [
+            (model_name, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inserted_bytes = 0
+            for row in rows:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO embeddings "
+                    "(model_name, text_hash, embedding, accessed_at) VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                if cursor.rowcount > 0:
+                    inserted_bytes += len(row[2])
+            conn.execute(
+                "UPDATE stats SET size_bytes = size_bytes + ? WHERE id = 0", (inserted_bytes,)
+            )
+            (size_bytes,) = conn.execute("SELECT size_bytes FROM stats WHERE id = 0").fetchone()
+            if size_bytes > self.max_bytes:
+                self._evict(conn, size_bytes - self.max_bytes * (1 - self.EVICTION_HEADROOM))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection, excess_bytes: float):
+        evicted_bytes = 0
+        evicted = 0
+        while evicted_bytes < excess_bytes:
+            rows = conn.execute(
+                "SELECT model_name, text_hash, length(embedding) FROM embeddings "
+                "ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            keys = []
+            for model_name, key, size in rows:
+                if evicted_bytes >= excess_bytes:
+                    break
+                keys.append((model_name, key))
+                evicted_bytes += size
+            conn.executemany("DELETE FROM embeddings WHERE model_name = ? AND text_hash = ?", keys)
+            evicted += len(keys)
+
+        conn.execute(
+            "UPDATE stats SET size_bytes = max(size_bytes - ?, 0) WHERE id = 0", (evicted_bytes,)
+        )
+        DISK_CACHE_EVICTIONS.inc(evicted)
+        logger.debug(f"Evicted {evicted} embeddings ({evicted_bytes} bytes) from disk cache")
+
+
+@lru_cache(maxsize=1)
+def get_disk_cache() -> Optional[DiskEmbeddingCache]:
+    if not EMBEDDING_DISK_CACHE_PATH:
+        return None
+    return DiskEmbeddingCache(EMBEDDING_DISK_CACHE_PATH, EMBEDDING_DISK_CACHE_MAX_BYTES)
@@ -2,3 +2,48 @@ import os
 
 DEFAULT_EMBEDDING_MODEL = os.getenv("DEFAULT_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
 VECTORAPI_STORE_SCHEMA = os.getenv("VECTORAPI_STORE_SCHEMA", "vector")
+
+# Micro-batching of concurrent encode calls
+EMBEDDER_MAX_BATCH_SIZE = int(os.getenv("EMBEDDER_MAX_BATCH_SIZE", "32"))
+EMBEDDER_MAX_BATCH_WAIT_MS = float(os.getenv("EMBEDDER_MAX_BATCH_WAIT_MS", "5"))
+
+# Inference executor: "thread" or "process" replicas, each pinned to INFERENCE_TORCH_THREADS
+# intra-op threads (0 keeps the torch default)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_REPLICAS = int(os.getenv("INFERENCE_REPLICAS", "1"))
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", "0"))
+
+# In-memory embedding cache budget per model, in bytes (0 disables the cache)
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Optional SQLite embedding cache shared by all workers on a host and kept across restarts
+EMBEDDING_DISK_CACHE_PATH = os.getenv("EMBEDDING_DISK_CACHE_PATH")
+EMBEDDING_DISK_CACHE_MAX_BYTES = int(
+    os.getenv("EMBEDDING_DISK_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))
+)
+
+# Models loaded and warmed up on startup, and the memory budget for the weights of loaded models
+EMBEDDER_PRELOAD_MODELS = [
+    model_name.strip()
+    for model_name in os.getenv("EMBEDDER_PRELOAD_MODELS", DEFAULT_EMBEDDING_MODEL).split(",")
+    if model_name.strip()
+]
+EMBEDDER_MEMORY_BUDGET_BYTES = int(
+    os.getenv("EMBEDDER_MEMORY_BUDGET_BYTES", str(2 * 1024 * 1024 * 1024))
+)
+
+# CPU inference backend per model ("fp32", "int8", "bf16" or "traced"), configured as
+# EMBEDDER_BACKENDS="BAAI/bge-small-en-v1.5=int8,other/model=bf16"
+EMBEDDER_DEFAULT_BACKEND = os.getenv("EMBEDDER_DEFAULT_BACKEND", "fp32")
+EMBEDDER_BACKENDS = dict(
+    (model_name.strip(), backend.strip())
+    for model_name, _, backend in (
+        item.partition("=") for item in os.getenv("EMBEDDER_BACKENDS", "").split(",") if item
+    )
+)
+
+# Inputs are truncated to this many tokens (0 keeps the model's own limit)
+EMBEDDER_MAX_SEQ_LENGTH = int(os.getenv("EMBEDDER_MAX_SEQ_LENGTH", "0"))
+
+# Number of inputs /v1/embeddings/stream encodes per batch before writing results back
+EMBEDDINGS_STREAM_BATCH_SIZE = int(os.getenv("EMBEDDINGS_STREAM_BATCH_SIZE", "256"))
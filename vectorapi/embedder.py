@@ -1,5 +1,7 @@
-from functools import lru_cache
-from typing import List
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import opentelemetry.trace
@@ -8,9 +10,25 @@ from huggingface_hub.utils._errors import RepositoryNotFoundError
 from loguru import logger
 from numpy.typing import NDArray
 from sentence_transformers import SentenceTransformer
+from sentence_transformers.util import batch_to_device
+from transformers import BatchEncoding
 
-from vectorapi.const import DEFAULT_EMBEDDING_MODEL
+from vectorapi.backends import apply_backend, backend_context, backend_for_model
+from vectorapi.batching import EncodeBatcher
+from vectorapi.cache import EmbeddingCache, get_disk_cache
+from vectorapi.const import (
+    DEFAULT_EMBEDDING_MODEL,
+    EMBEDDER_MAX_BATCH_SIZE,
+    EMBEDDER_MAX_BATCH_WAIT_MS,
+    EMBEDDER_MAX_SEQ_LENGTH,
+    EMBEDDER_MEMORY_BUDGET_BYTES,
+    EMBEDDING_CACHE_MAX_BYTES,
+)
 from vectorapi.exceptions import EmbedderModelNotFound
+from vectorapi.inference import get_inference_executor
+
+
+WARMUP_TEXT = "Why is my Mimir query performance so slow? "
 
 
 def get_torch_device() -> str:
@@ -30,13 +48,30 @@ class Embedder:
         batch_size: int = 32,
         device: str = get_torch_device(),
         normalize_embeddings: bool = True,
+        max_batch_size: int = EMBEDDER_MAX_BATCH_SIZE,
+        max_batch_wait_ms: float = EMBEDDER_MAX_BATCH_WAIT_MS,
+        cache_max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        backend: Optional[str] = None,
+        max_seq_length: int = EMBEDDER_MAX_SEQ_LENGTH,
     ):
         self.model_name = model_name
-        self.model = self._load_model(model_name)
+        self.backend = backend or backend_for_model(model_name)
+        self.model = apply_backend(self._load_model(model_name), self.backend, device)
+        self.model.to(device)
+        if max_seq_length > 0:
+            self.model.max_seq_length = min(max_seq_length, self.model.max_seq_length)
+        self.max_seq_length: int = self.model.max_seq_length
+        self.lower_case: bool = getattr(self.model._first_module(), "do_lower_case", False)
+        # texts are tokenized once up front and padded per bucket, which is what we want here
+        self.model.tokenizer.deprecation_warnings["Asking-to-pad-a-fast-tokenizer"] = True
         self.batch_size = batch_size
         self.device = device
         self.normalize_embeddings = normalize_embeddings
         self.dimension: int = self.model.get_sentence_embedding_dimension()
+        self.memory_bytes = model_memory_bytes(self.model)
+        self.cache = EmbeddingCache(model_name, cache_max_bytes)
+        self.disk_cache = get_disk_cache()
+        self.batcher = EncodeBatcher(self._aencode_uncached, max_batch_size, max_batch_wait_ms)
 
     def _load_model(self, model_name: str) -> SentenceTransformer:
         """
@@ -55,34 +90,268 @@ class Embedder:
     def _trace_attributes(self):
         return {
             "model_name": self.model_name,
+            "backend": self.backend,
             "batch_size": self.batch_size,
             "device": self.device,
             "normalize_embeddings": self.normalize_embeddings,
             "dimension": self.dimension,
+            "max_seq_length": self.max_seq_length,
         }
 
-    @lru_cache(maxsize=128)
-    def encode(self, text: str) -> NDArray[np.float_]:
+    def encode(self, text: str) -> NDArray[np.float32]:
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        if self.disk_cache is not None:
+            (stored,) = self.disk_cache.get_many(self.model_name, [text])
+            if stored is not None:
+                return self.cache.put(text, stored)
+
         tracer = opentelemetry.trace.get_tracer(__name__)
         with tracer.start_as_current_span("Embedder.encode", attributes=self._trace_attributes):
-            return self.model.encode(
-                text,
-                batch_size=self.batch_size,
-                device=self.device,
-                normalize_embeddings=self.normalize_embeddings,
+            vector = self.encode_batch([text])[0]
+        vector = self.cache.put(text, vector)
+        if self.disk_cache is not None:
+            self.disk_cache.put_many(self.model_name, [text], [vector])
+        return vector
+
+    def tokenize(self, texts: List[str]) -> BatchEncoding:
+        """
+        Tokenize texts the way the model's Transformer module does, truncated to
+        `max_seq_length` tokens but without padding.
+        """
+        texts = [text.strip() for text in texts]
+        if self.lower_case:
+            texts = [text.lower() for text in texts]
+        return self.model.tokenizer(
+            texts, truncation="longest_first", max_length=self.max_seq_length, padding=False
+        )
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        return [len(input_ids) for input_ids in self.tokenize(texts)["input_ids"]]
+
+    def encode_batch(self, texts: List[str]) -> NDArray[np.float32]:
+        """
+        Encode a list of texts, returning one row per text in the original order.
+
+        Texts are tokenized once, sorted by token length and run in batches of `batch_size`
+        texts of similar length, so little compute is spent on padding.
+        """
+        tracer = opentelemetry.trace.get_tracer(__name__)
+        attributes = {**self._trace_attributes, "num_texts": len(texts)}
+        with tracer.start_as_current_span("Embedder.encode_batch", attributes=attributes):
+            encoded = self.tokenize(texts)
+            order = np.argsort(
+                [len(input_ids) for input_ids in encoded["input_ids"]], kind="stable"
             )
+            embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+            for start in range(0, len(texts), self.batch_size):
+                bucket = order[start : start + self.batch_size]
+                features = self.model.tokenizer.pad(
+                    {key: [encoded[key][i] for i in bucket] for key in encoded.keys()},
+                    return_tensors="pt",
+                )
+                embeddings[bucket] = self._forward(features)
+            return embeddings
+
+    def _forward(self, features: BatchEncoding) -> NDArray[np.float32]:
+        features = batch_to_device(dict(features), self.device)
+        with torch.no_grad(), backend_context(self.backend):
+            embeddings = self.model.forward(features)["sentence_embedding"]
+            if self.normalize_embeddings:
+                embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings.float().cpu().numpy()
+
+    async def _aencode_uncached(self, texts: List[str]) -> NDArray[np.float32]:
+        return await get_inference_executor().run(self, "encode_batch", texts)
+
+    async def _cached(self, texts: List[str]) -> List[Optional[NDArray[np.float32]]]:
+        # look texts up in memory first, then in the shared disk cache
+        cached = [self.cache.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if self.disk_cache is None or not missing:
+            return cached
+
+        stored = await asyncio.to_thread(
+            self.disk_cache.get_many, self.model_name, [texts[i] for i in missing]
+        )
+        for i, vector in zip(missing, stored):
+            if vector is not None:
+                cached[i] = self.cache.put(texts[i], vector)
+        return cached
+
+    async def _store(
+        self, texts: List[str], vectors: NDArray[np.float32]
+    ) -> List[NDArray[np.float32]]:
+        stored = [self.cache.put(text, vector) for text, vector in zip(texts, vectors)]
+        if self.disk_cache is not None:
+            await asyncio.to_thread(self.disk_cache.put_many, self.model_name, texts, stored)
+        return stored
+
+    async def aencode_batch(self, texts: List[str]) -> NDArray[np.float32]:
+        """
+        Encode a list of texts, running the ones missing from the caches in a single batched
+        forward pass on the inference executor.
+        """
+        cached = await self._cached(texts)
+        missing = list(dict.fromkeys(text for text, v in zip(texts, cached) if v is None))
+        computed: Dict[str, NDArray[np.float32]] = {}
+        if missing:
+            encoded = await self._aencode_uncached(missing)
+            computed = dict(zip(missing, await self._store(missing, encoded)))
+
+        vectors = [computed[text] if v is None else v for text, v in zip(texts, cached)]
+        return np.stack(vectors) if vectors else np.empty((0, self.dimension), np.float32)
+
+    async def acount_tokens(self, texts: List[str]) -> List[int]:
+        return await get_inference_executor().run(self, "count_tokens", texts)
+
+    async def aencode(self, text: str) -> NDArray[np.float32]:
+        """
+        Encode a single text, batching it together with other concurrent calls for this model.
+        The returned array is shared through the cache and read-only.
+        """
+        (cached,) = await self._cached([text])
+        if cached is not None:
+            return cached
+        vector = await self.batcher.encode(text)
+        (stored,) = await self._store([text], vector[np.newaxis])
+        return stored
+
+    def warmup(self, rounds: int = 2) -> None:
+        """
+        Run a few forward passes of different lengths so lazy initialization and allocator
+        growth happen before the model serves traffic.
+        """
+        texts = [WARMUP_TEXT * repeat for repeat in (1, 4, 16)]
+        for _ in range(rounds):
+            self.encode_batch(texts)
 
     def generate_similarity(self, source_sentence: str, sentences: List[str]) -> List[float]:
-        source_vector = self.encode(source_sentence)
+        vectors = self.encode_batch([source_sentence, *sentences])
+        return similarity_scores(vectors[0], vectors[1:]).tolist()
+
+    async def agenerate_similarity(
+        self, source_sentence: str, sentences: List[str]
+    ) -> NDArray[np.float32]:
+        """
+        Score each sentence against the source sentence, encoding all of them in one batch.
+        """
+        vectors = await self.aencode_batch([source_sentence, *sentences])
+        return similarity_scores(vectors[0], vectors[1:])
+
+
+def similarity_scores(
+    source_vector: NDArray[np.float32], vectors: NDArray[np.float32]
+) -> NDArray[np.float32]:
+    """
+    Dot product of every row of `vectors` with `source_vector` as a single matrix-vector product.
+    For normalized embeddings this is the cosine similarity.
+    """
+    return vectors @ source_vector
+
 
-        similarity_scores: List[float] = []
-        for sentence in sentences:
-            vector = self.encode(sentence)
-            similarity = np.matmul(source_vector, vector.T)
-            similarity_scores.append(similarity)
-        return similarity_scores
+def top_k_indices(scores: NDArray[np.float32], k: int) -> NDArray[np.intp]:
+    """
+    Indices of the `k` highest scores, best first, without sorting the whole array.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def model_memory_bytes(model: torch.nn.Module) -> int:
+    """
+    Resident size of the model weights, including the packed weights of quantized layers.
+    """
+
+    def tensor_bytes(value: Any) -> int:
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+
+class EmbedderRegistry:
+    """
+    Keeps the loaded embedders, evicting the least recently used ones once the total memory of
+    their weights goes over `memory_budget_bytes`. The most recently used model is never evicted,
+    even if it doesn't fit in the budget on its own.
+    """
+
+    def __init__(self, memory_budget_bytes: int = EMBEDDER_MEMORY_BUDGET_BYTES):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.preloading = False
+        self._embedders: OrderedDict[str, Embedder] = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(embedder.memory_bytes for embedder in self._embedders.values())
+
+    def loaded(self) -> List[Embedder]:
+        return list(self._embedders.values())
+
+    def get(self, model_name: str) -> Embedder:
+        with self._lock:
+            embedder = self._lookup(model_name)
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+        if embedder is not None:
+            return embedder
+
+        # load outside the registry lock so a slow load doesn't block other models
+        with load_lock:
+            with self._lock:
+                embedder = self._lookup(model_name)
+            if embedder is not None:
+                return embedder
+
+            logger.info(f"Loading embedder {model_name}")
+            embedder = Embedder(model_name=model_name)
+            with self._lock:
+                self._embedders[model_name] = embedder
+                self._evict()
+            return embedder
+
+    def _lookup(self, model_name: str) -> Optional[Embedder]:
+        embedder = self._embedders.get(model_name)
+        if embedder is not None:
+            self._embedders.move_to_end(model_name)
+        return embedder
+
+    def _evict(self):
+        while len(self._embedders) > 1 and self.memory_bytes > self.memory_budget_bytes:
+            model_name, embedder = self._embedders.popitem(last=False)
+            logger.info(f"Evicting embedder {model_name} ({embedder.memory_bytes} bytes)")
+
+
+embedder_registry = EmbedderRegistry()
 
 
-@lru_cache(maxsize=3)
 def get_embedder(model_name: str) -> Embedder:
-    return Embedder(model_name=model_name)
+    return embedder_registry.get(model_name)
+
+
+async def preload_embedders(model_names: List[str]) -> None:
+    """
+    Load and warm up `model_names` on every inference replica. The registry reports
+    `preloading` until this is done so the service is not marked healthy with cold models.
+    """
+    embedder_registry.preloading = True
+    try:
+        executor = get_inference_executor()
+        for model_name in model_names:
+            embedder = await asyncio.to_thread(get_embedder, model_name)
+            logger.info(f"Warming up embedder {model_name}")
+            await asyncio.gather(
+                *[executor.run(embedder, "warmup") for _ in range(executor.replicas)]
+            )
+    except Exception as e:
+        logger.exception(e)
+    finally:
+        embedder_registry.preloading = False
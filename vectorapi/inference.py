@@ -0,0 +1,94 @@
+"""Executor running embedding inference off the event loop."""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any
+
+import torch
+from loguru import logger
+
+from vectorapi.const import INFERENCE_EXECUTOR, INFERENCE_REPLICAS, INFERENCE_TORCH_THREADS
+
+if TYPE_CHECKING:
+    from vectorapi.embedder import Embedder
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+def _init_replica(torch_threads: int):
+    # pin the number of intra-op threads so replicas don't oversubscribe the CPU
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+
+
+def _run_in_replica_process(model_name: str, method: str, *args: Any) -> Any:
+    # process replicas hold their own copy of each model, loaded on first use
+    from vectorapi.embedder import get_embedder
+
+    return getattr(get_embedder(model_name), method)(*args)
+
+
+class InferenceExecutor:
+    """
+    Runs embedder methods on a pool of replicas so inference never blocks the event loop.
+
+    In `thread` mode the replicas are threads sharing the models loaded in this process (torch
+    releases the GIL while running). In `process` mode each replica is a separate process
+    holding its own copy of every model it serves.
+    """
+
+    def __init__(
+        self,
+        mode: str = INFERENCE_EXECUTOR,
+        replicas: int = INFERENCE_REPLICAS,
+        torch_threads: int = INFERENCE_TORCH_THREADS,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(
+                f"Invalid inference executor mode {mode}, expected one of {EXECUTOR_MODES}"
+            )
+        self.mode = mode
+        self.replicas = max(1, replicas)
+        self.torch_threads = torch_threads
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> Executor:
+        logger.debug(
+            f"Starting inference executor mode={self.mode} replicas={self.replicas} "
+            f"torch_threads={self.torch_threads}"
+        )
+        if self.mode == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.replicas,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_replica,
+                initargs=(self.torch_threads,),
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.replicas,
+            thread_name_prefix="inference",
+            initializer=_init_replica,
+            initargs=(self.torch_threads,),
+        )
+
+    async def run(self, embedder: Embedder, method: str, *args: Any) -> Any:
+        """
+        Call `embedder.<method>(*args)` on one of the replicas and await its result.
+        """
+        loop = asyncio.get_running_loop()
+        if self.mode == "process":
+            call = partial(_run_in_replica_process, embedder.model_name, method, *args)
+        else:
+            call = partial(getattr(embedder, method), *args)
+        return await loop.run_in_executor(self._executor, call)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_inference_executor() -> InferenceExecutor:
+    return InferenceExecutor()
@@ -1,4 +1,5 @@
 """main.py is the entrypoint of the gateway."""
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
@@ -21,7 +22,10 @@ from starlette.responses import Response
 from starlette_exporter import PrometheusMiddleware, handle_metrics
 
 from vectorapi import log, responses
+from vectorapi.const import EMBEDDER_PRELOAD_MODELS
 from vectorapi.docs import OPENAPI_DESCRIPTION, OPENAPI_TAGS_METADATA
+from vectorapi.embedder import embedder_registry, preload_embedders
+from vectorapi.inference import get_inference_executor
 from vectorapi.pgvector.base import Base
 from vectorapi.pgvector.db import engine
 from vectorapi.routes.collection_points import router as collection_points_router
@@ -49,7 +53,10 @@ async def health(request: fastapi.Request):
     Check if this service is healthy, if there are too many threadpool threads in use
     there is a risk of high latency and the service should be marked as
     unhealthy.
+    The service is not ready until the preloaded models are loaded and warmed up.
     """
+    if embedder_registry.preloading:
+        return Response("Loading models", status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE)
     return Response("OK", status_code=fastapi.status.HTTP_200_OK)
 
 
@@ -61,9 +68,15 @@ async def lifespan(app: fastapi.FastAPI):
     loguru.logger.debug("Syncing postgres schema metadata..")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.reflect)
+
+    # load and warm up models in the background, /healthz reports ready once this is done
+    embedder_registry.preloading = True
+    preload = asyncio.create_task(preload_embedders(EMBEDDER_PRELOAD_MODELS))
     yield
 
     # executed after the application finishes handling requests
+    preload.cancel()
+    get_inference_executor().shutdown()
 
 
 def create_app() -> fastapi.FastAPI:
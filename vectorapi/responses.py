@@ -8,6 +8,7 @@ import opentelemetry
 import opentelemetry.trace
 import orjson
 from fastapi import responses
+from starlette.types import Receive, Scope, Send
 
 
 class ORJSONResponse(responses.ORJSONResponse):
@@ -17,3 +18,20 @@ class ORJSONResponse(responses.ORJSONResponse):
         tracer = opentelemetry.trace.get_tracer(__name__)
         with tracer.start_as_current_span("orjson.dumps response"):
             return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class NDJSONStreamingResponse(responses.StreamingResponse):
+    """
+    StreamingResponse for NDJSON content produced while the request body is still being read.
+
+    The default StreamingResponse listens for client disconnects on `receive` while streaming,
+    which would swallow the request body messages the content iterator is reading. Here a
+    disconnect surfaces through the request body stream instead.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
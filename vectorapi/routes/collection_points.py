@@ -40,10 +40,11 @@ async def upsert_point(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Must provide either embedding or input",
         )
-    elif request.embedding is None:
+    elif request.embedding is None and request.input is not None:
         try:
             embedder = get_embedder(model_name=request.model)
-            request.embedding = embedder.encode(request.input).tolist()
+            vector = await embedder.aencode(request.input)
+            request.embedding = vector.tolist()
         except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -167,10 +168,10 @@ async def search(
     try:
         embedder = get_embedder(model_name=request.model)
     except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid model name {request.model} please use a SentenceTransformer compatible model (e.g. DEFAULT_EMBEDDING_MODEL)",
-            ) from e
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid model name {request.model} please use a SentenceTransformer compatible model (e.g. DEFAULT_EMBEDDING_MODEL)",
+        ) from e
     except Exception as e:
         logger.exception(e)
         raise HTTPException(
@@ -186,7 +187,7 @@ async def search(
         )
 
     try:
-        vector = embedder.encode(request.input)
+        vector = await embedder.aencode(request.input)
     except Exception as e:
         logger.exception(e)
         raise HTTPException(
@@ -1,17 +1,19 @@
 """models.py contains model configuration related apis."""
-from typing import List
+import asyncio
+from typing import Annotated, AsyncIterator, List, Optional
 
 import numpy as np
-from fastapi import APIRouter, HTTPException, status
+import orjson
+from fastapi import APIRouter, HTTPException, Request, status
 from loguru import logger
 from numpy.typing import NDArray
 from pydantic import BaseModel, ConfigDict, Field
 from pydantic.alias_generators import to_camel
 
-from vectorapi.const import DEFAULT_EMBEDDING_MODEL
-from vectorapi.embedder import Embedder, get_embedder
+from vectorapi.const import DEFAULT_EMBEDDING_MODEL, EMBEDDINGS_STREAM_BATCH_SIZE
+from vectorapi.embedder import Embedder, embedder_registry, get_embedder, top_k_indices
 from vectorapi.exceptions import EmbedderModelNotFound
-from vectorapi.responses import ORJSONResponse
+from vectorapi.responses import NDJSONStreamingResponse, ORJSONResponse
 
 router = APIRouter(
     tags=["embeddings"],
@@ -40,9 +42,12 @@ class EmbeddingResponse(BaseModelCamel):
     usage: EmbeddingResponseUsage
 
 
+NonEmptyStr = Annotated[str, Field(min_length=1)]
+
+
 class EmbeddingRequest(BaseModelCamel):
     model: str = Field(default=DEFAULT_EMBEDDING_MODEL, min_length=1)
-    input: str = Field(min_length=1)
+    input: NonEmptyStr | Annotated[List[NonEmptyStr], Field(min_length=1)]
     user: str | None = None
 
 
@@ -71,44 +76,141 @@ def try_get_embedder(model_name: str) -> Embedder:
 )
 async def create_embeddings(request: EmbeddingRequest):
     """
-    Create embeddings for a given text.
+    Create embeddings for a given text or list of texts.
+    A list of texts is encoded in a single batched forward pass.
+    Usage reports the number of tokens the model saw, after truncation.
     """
     embedder = try_get_embedder(model_name=request.model)
+    texts = [request.input] if isinstance(request.input, str) else request.input
     try:
-        vector: NDArray[np.float_] = embedder.encode(request.input)
+        vectors: NDArray[np.float32]
+        if isinstance(request.input, str):
+            vector, token_counts = await asyncio.gather(
+                embedder.aencode(request.input), embedder.acount_tokens(texts)
+            )
+            vectors = vector[np.newaxis]
+        else:
+            vectors, token_counts = await asyncio.gather(
+                embedder.aencode_batch(request.input), embedder.acount_tokens(texts)
+            )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error encoding text: {e}",
         )
-    data = [EmbeddingResponseData(index=0, embedding=vector.tolist())]
+    data = [
+        EmbeddingResponseData(index=i, embedding=vector.tolist())
+        for i, vector in enumerate(vectors)
+    ]
+    prompt_tokens = sum(token_counts)
     return EmbeddingResponse(
         data=data,
         model=request.model,
-        usage=EmbeddingResponseUsage(promptTokens=0, totalTokens=0),
+        usage=EmbeddingResponseUsage(promptTokens=prompt_tokens, totalTokens=prompt_tokens),
     )
 
 
+async def _read_inputs(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Yield the inputs of an NDJSON body, one JSON string per line, as the body is received.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_input(line)
+    if buffer.strip():
+        yield _parse_input(buffer)
+
+
+def _parse_input(line: bytes) -> str:
+    text = orjson.loads(line)
+    if not isinstance(text, str) or not text:
+        raise ValueError("each line must be a non-empty JSON string")
+    return text
+
+
+async def _batched(inputs: AsyncIterator[str], batch_size: int) -> AsyncIterator[List[str]]:
+    batch: List[str] = []
+    async for text in inputs:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _stream_embeddings(
+    embedder: Embedder, chunks: AsyncIterator[bytes]
+) -> AsyncIterator[bytes]:
+    index = 0
+    try:
+        async for batch in _batched(_read_inputs(chunks), EMBEDDINGS_STREAM_BATCH_SIZE):
+            vectors = await embedder.aencode_batch(batch)
+            yield b"".join(
+                orjson.dumps(
+                    {"index": index + i, "object": "embedding", "embedding": vector},
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE,
+                )
+                for i, vector in enumerate(vectors)
+            )
+            index += len(batch)
+    except Exception as e:
+        # the status code is already sent, so report the error as the last line
+        logger.exception(e)
+        yield orjson.dumps(
+            {"index": index, "object": "error", "error": str(e)}, option=orjson.OPT_APPEND_NEWLINE
+        )
+
+
+@router.post(
+    "/embeddings/stream",
+    name="stream_embeddings",
+    response_class=NDJSONStreamingResponse,
+)
+async def stream_embeddings(request: Request, model: str = DEFAULT_EMBEDDING_MODEL):
+    """
+    Create embeddings for a newline-delimited body with one JSON string per line.
+    Inputs are encoded in batches as the body is received, and each batch is written
+    back as NDJSON embedding lines as soon as it is done, in input order.
+    If an input fails, an `error` line is written and the stream ends.
+    """
+    embedder = try_get_embedder(model_name=model)
+    return NDJSONStreamingResponse(_stream_embeddings(embedder, request.stream()))
+
+
 class SimilarityRequest(BaseModelCamel):
     model: str = Field(default=DEFAULT_EMBEDDING_MODEL, min_length=1)
     source_sentence: str = Field(min_length=1)
     sentences: List[str]
+    top_k: Optional[int] = Field(default=None, gt=0)
+
+
+class SimilarityResult(BaseModelCamel):
+    index: int
+    score: float
 
 
 @router.post(
     "/similarity",
     name="similarity",
-    response_model=List[float],
+    response_model=List[float] | List[SimilarityResult],
     response_class=ORJSONResponse,
 )
 async def similarity(request: SimilarityRequest):
     """
-    Calculate similarity between two inputs
+    Calculate similarity between a source sentence and a list of sentences.
+    Returns one score per sentence, or the `top_k` best matches with their index when set.
     """
     embedder = try_get_embedder(model_name=request.model)
 
     try:
-        similarity_scores = embedder.generate_similarity(request.source_sentence, request.sentences)
+        similarity_scores = await embedder.agenerate_similarity(
+            request.source_sentence, request.sentences
+        )
     except Exception as e:
         logger.exception(e)
         raise HTTPException(
@@ -116,4 +218,42 @@ async def similarity(request: SimilarityRequest):
             detail=f"Error calculating similarity: {e}",
         )
 
-    return similarity_scores
+    scores = similarity_scores.tolist()
+    if request.top_k is None:
+        return scores
+
+    return [
+        SimilarityResult(index=index, score=scores[index])
+        for index in top_k_indices(similarity_scores, request.top_k).tolist()
+    ]
+
+
+class ModelData(BaseModelCamel):
+    id: str
+    object: str = "model"
+    dimension: int
+    memory_bytes: int
+
+
+class ModelsResponse(BaseModelCamel):
+    object: str = "list"
+    data: List[ModelData]
+
+
+@router.get(
+    "/models",
+    name="list_models",
+    response_model=ModelsResponse,
+    response_class=ORJSONResponse,
+)
+async def list_models():
+    """
+    List the embedding models currently loaded, least recently used first.
+    """
+    data = [
+        ModelData(
+            id=embedder.model_name, dimension=embedder.dimension, memoryBytes=embedder.memory_bytes
+        )
+        for embedder in embedder_registry.loaded()
+    ]
+    return ModelsResponse(data=data)